@@ -1,3 +1,4 @@
+import io
 import sqlite3
 import pandas as pd
 import streamlit as st
@@ -6,51 +7,67 @@ import plotly.graph_objects as go
 
 DB = "logs.db"
 
+@st.cache_resource
+def get_conn():
+    # one connection shared across reruns and sessions keeps the page cache warm
+    conn = sqlite3.connect(DB, check_same_thread=False)
+    conn.execute("PRAGMA mmap_size=268435456;")
+    return conn
+
 @st.cache_data
 def get_tables():
-    conn = sqlite3.connect(DB)
+    conn = get_conn()
     tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'logs_%';").fetchall()]
-    conn.close()
 
     return tables 
 
+FILTER_COLS = ["chip_id", "design_block", "team", "impact_score", "test_condition"]
+
+# low-cardinality text columns held as pandas categoricals
+CAT_COLS = [*FILTER_COLS, "failure_type"]
+
+# strptime format of the Date column per source; mac/openssh/android Date has no year, so stays a string
+DATE_FORMATS = {
+    "logs_bgl": "%Y.%m.%d",
+    "logs_openstack": "%Y-%m-%d",
+}
+
+# every cached query below takes version only as a cache key, so new commits invalidate it
+def table_version(table):
+    """Cheap change token for cache keys: bumps when another connection commits, or rows are added."""
+    conn = get_conn()
+    data_version = conn.execute("PRAGMA data_version;").fetchone()[0]
+    max_rowid = conn.execute(f"SELECT MAX(rowid) FROM {table};").fetchone()[0]
+    return (data_version, max_rowid)
+
 @st.cache_data
-def get_filter_options(table):
-    conn = sqlite3.connect(DB)
-    query = f"""
-        SELECT DISTINCT 
-            TRIM(chip_id) AS chip_id,
-            TRIM(design_block) AS design_block,
-            TRIM(team) AS team,
-            TRIM(impact_score) AS impact_score,
-            TRIM(test_condition) AS test_condition
+def get_filter_options(table, version):
+    conn = get_conn()
+    # normalize in SQL so only the distinct values come back
+    options = {}
+    for col in FILTER_COLS:
+        cur = conn.execute(f"""
+            SELECT DISTINCT UPPER(TRIM({col}))
             FROM {table}
-        WHERE chip_id IS NOT NULL 
-           OR design_block IS NOT NULL 
-           OR team IS NOT NULL 
-           OR impact_score IS NOT NULL 
-           OR test_condition IS NOT NULL; """
-    
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-
-    # Clean duplicates / normalize values
-    for col in df.columns:
-        if col in df:
-            df[col] = (
-                df[col]
-                .astype(str)
-                .str.strip()
-                .str.upper()         # optional → make case-insensitive
-                .replace("NAN", "")  # clean up NaN text if it appears
-            )
-    return df
+            WHERE {col} IS NOT NULL AND TRIM({col}) <> '';""")
+        options[col] = sorted(r[0] for r in cur.fetchall())
 
+    return options
 
-def build_where_clause(filters):
-    clauses = []
+@st.cache_data
+def get_table_columns(table):
+    conn = get_conn()
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({table});").fetchall()]
+
+
+def freeze_filters(filters):
+    """Hashable, order-independent form of the sidebar filters for cache keys."""
+    return tuple(sorted((col, tuple(sorted(vals))) for col, vals in filters.items() if vals))
+
+def build_where_clause(filters, conditions=()):
+    clauses = list(conditions)
     params = []
-    for col, vals in filters.items():
+    for col, vals in filters:
         if vals:
             placeholders = ",".join(["?"] * len(vals))
             clauses.append(f"LOWER({col}) IN ({placeholders})")
@@ -58,17 +75,93 @@ def build_where_clause(filters):
     where_caluse = " WHERE " + " AND ".join(clauses) if clauses else ""
     return where_caluse, params 
 
-def load_filtered_data(conn, table, filters, limit=500000):
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)
+def load_filtered_data(table, version, filters, limit=500000):
+    conn = get_conn()
     where_clause, params = build_where_clause(filters)
     limit_clause = f"LIMIT {limit}" if limit else ""
     query = f"SELECT * FROM {table} {where_clause} {limit_clause};"
+    df = pd.read_sql_query(query, conn, params=params or None)
+    for c in CAT_COLS:
+        if c in df:
+            df[c] = df[c].astype("category")
+    return df
+
+# Downloads: built only when a download button is clicked; only the latest blob is kept
+
+@st.cache_data(ttl=600, max_entries=1, show_spinner=False)
+def export_csv(table, version, filters):
+    return load_filtered_data(table, version, filters).to_csv(index=False).encode("utf-8")
+
+@st.cache_data(ttl=600, max_entries=1, show_spinner=False)
+def export_parquet(table, version, filters):
+    buf = io.BytesIO()
+    load_filtered_data(table, version, filters).to_parquet(buf, index=False, compression="zstd")
+    return buf.getvalue()
+
+# Chart aggregates: grouped in SQLite so only the counts reach pandas
+
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)
+def count_summary(table, version, filters):
+    conn = get_conn()
+    where_clause, params = build_where_clause(filters)
+    if "chip_id" not in get_table_columns(table):
+        row = conn.execute(f"SELECT COUNT(*) FROM {table} {where_clause};", params).fetchone()
+        return {"total": row[0]}
+    row = conn.execute(f"SELECT COUNT(*), COUNT(DISTINCT chip_id) FROM {table} {where_clause};", params).fetchone()
+    return {"total": row[0], "chip_id": row[1]}
+
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)
+def top_counts(table, version, filters, col, limit=10):
+    conn = get_conn()
+    where_clause, params = build_where_clause(filters, [f"{col} IS NOT NULL"])
+    limit_clause = f"LIMIT {limit}" if limit else ""
+    query = f"""
+        SELECT {col}, COUNT(*) AS count FROM {table} {where_clause}
+        GROUP BY {col} ORDER BY count DESC {limit_clause};"""
+    return pd.read_sql_query(query, conn, params=params or None)
+
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)
+def trend_counts(table, version, filters, date_col):
+    conn = get_conn()
+    where_clause, params = build_where_clause(filters, [f"{date_col} IS NOT NULL"])
+    query = f"""
+        SELECT {date_col}, COUNT(*) AS count FROM {table} {where_clause}
+        GROUP BY {date_col} ORDER BY {date_col};"""
+    trend = pd.read_sql_query(query, conn, params=params or None)
+    if date_col == "Date" and table in DATE_FORMATS:
+        trend[date_col] = pd.to_datetime(trend[date_col], format=DATE_FORMATS[table], errors="coerce")
+        # daily buckets with zero-filled gaps keep the rolling average honest
+        trend = (trend.dropna(subset=[date_col]).set_index(date_col)["count"]
+                 .resample("D").sum().reset_index())
+    return trend
+
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)
+def heatmap_counts(table, version, filters):
+    conn = get_conn()
+    where_clause, params = build_where_clause(filters, ["design_block IS NOT NULL", "team IS NOT NULL"])
+    query = f"""
+        SELECT design_block, team, COUNT(*) AS count FROM {table} {where_clause}
+        GROUP BY design_block, team;"""
     return pd.read_sql_query(query, conn, params=params or None)
 
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)
+def failure_trend(table, version, filters, date_col):
+    conn = get_conn()
+    where_clause, params = build_where_clause(filters, [f"{date_col} IS NOT NULL", "failure_type IS NOT NULL"])
+    query = f"""
+        SELECT {date_col}, failure_type, COUNT(*) AS count FROM {table} {where_clause}
+        GROUP BY {date_col}, failure_type ORDER BY {date_col};"""
+    trend_cat = pd.read_sql_query(query, conn, params=params or None)
+    if date_col == "Date" and table in DATE_FORMATS:
+        trend_cat[date_col] = pd.to_datetime(trend_cat[date_col], format=DATE_FORMATS[table], errors="coerce")
+        trend_cat = trend_cat.dropna(subset=[date_col])
+    return trend_cat
+
 # Streamlit COnfiguration
 
 st.set_page_config(page_title="Log Analytics Dashbaord", layout="wide")
 st.sidebar.title("Log Dashboard")
-conn = sqlite3.connect(DB)
 
 tables = get_tables()
 
@@ -76,33 +169,37 @@ selected_table = st.sidebar.selectbox("Select Log Source", tables)
 
 # Sidebar filters (dynamic based on available cols)
 
-filter_cols = ["chip_id", "design_block", "team", "impact_score", "test_condition"]
-
-filters_df = get_filter_options(selected_table)
+version = table_version(selected_table)
+filter_options = get_filter_options(selected_table, version)
 active_filters = {}
 
-for col in filter_cols:
-    if col in filters_df.columns:
-        options = sorted(filters_df[col].dropna().str.upper().unique().tolist())
-        selected = st.sidebar.multiselect(f"Filter by {col}", options)
+for col in FILTER_COLS:
+    if col in filter_options:
+        selected = st.sidebar.multiselect(f"Filter by {col}", filter_options[col])
         if selected:
             active_filters[col] = selected
 
 
-df = load_filtered_data(conn, selected_table, active_filters)
+filters_key = freeze_filters(active_filters)
+table_cols = get_table_columns(selected_table)
+summary = count_summary(selected_table, version, filters_key)
+
+# full per-value counts, shared by the KPIs, the top-10 bars and the Pareto chart
+block_counts = top_counts(selected_table, version, filters_key, "design_block", limit=None) if "design_block" in table_cols else None
+team_counts = top_counts(selected_table, version, filters_key, "team", limit=None) if "team" in table_cols else None
 
 st.title(f"📊 Log Analytics Dashboard: {selected_table}")
 
-if not df.empty:
+if summary["total"]:
     c1,c2,c3,c4 = st.columns(4)
     with c1:
-        st.metric("Total logs", f"{len(df):,}")
+        st.metric("Total logs", f"{summary['total']:,}")
     with c2:
-        st.metric("Unique Chips", f"{df['chip_id'].nunique():,}" if "chip_id" in df else "N/A")
+        st.metric("Unique Chips", f"{summary['chip_id']:,}" if "chip_id" in summary else "N/A")
     with c3:
-        st.metric("Blocks impacted", f"{df['design_block'].nunique():,}" if "design_block" in df else "N/A")
+        st.metric("Blocks impacted", f"{len(block_counts):,}" if block_counts is not None else "N/A")
     with c4:
-        st.metric("Teams Impacted", f"{df['team'].nunique():,}" if "team" in df else "N/A")
+        st.metric("Teams Impacted", f"{len(team_counts):,}" if team_counts is not None else "N/A")
     
 
 # Show active filters
@@ -110,57 +207,55 @@ if active_filters:
     st.write("### Active Filters")
     st.write(", ".join([f"{col}: {', '.join(vals)}" for col, vals in active_filters.items()]))
 
-if not df.empty:
+if summary["total"]:
     
 
-    if "design_block" in df.columns:
+    if block_counts is not None:
         st.subheader("Top impacted Design Blocks")
-        top_blocks = df['design_block'].value_counts().reset_index()
-        top_blocks.columns = ["design_block", "count"]
-        fig = px.bar(top_blocks.head(10), x="design_block", y="count",text="count",
+        fig = px.bar(block_counts.head(10), x="design_block", y="count",text="count",
                      title="Top 10 impacted Design Blocks", color="count")
         fig.update_traces(textposition = "outside")
         st.plotly_chart(fig, use_container_width=True)
 
-    if "team" in df.columns:
+    if team_counts is not None:
         st.subheader("Logs by Team.")
-        team_counts = df['team'].value_counts().reset_index()
-        team_counts.columns = ["team", "count"]
         fig = px.bar(team_counts.head(10), x='team', y='count', text='count',
                      title='Top 10 Teams by Logs.', color='count')
         fig.update_traces(textposition='outside')
         st.plotly_chart(fig, use_container_width=True)
         
-    if "impact_score" in df.columns:
+    if "impact_score" in table_cols:
         st.subheader("Impact Score Distribution")
-        fig = px.pie(df, names="impact_score", title="Impact Score Breakdown")
+        impact_counts = top_counts(selected_table, version, filters_key, "impact_score", limit=None)
+        fig = px.pie(impact_counts, names="impact_score", values="count", title="Impact Score Breakdown")
         st.plotly_chart(fig, use_container_width=True)
 
     # Time trend (check if Date/Timestamp exists)
     date_col = None
     for c in ["Date", "Timestamp", "Time"]:
-        if c in df.columns:
+        if c in table_cols:
             date_col = c
             break
 
     if date_col:
         st.subheader(f"Log Trend over {date_col}")
-        trend = df.groupby(date_col).size().reset_index(name="count")
+        trend = trend_counts(selected_table, version, filters_key, date_col)
         fig = px.line(trend, x=date_col, y="count", title=f"Log over {date_col}")
         st.plotly_chart(fig, use_container_width=True)
 
     #  Heatmap
-    if "design_block" in df.columns and "team" in df.columns:
+    if "design_block" in table_cols and "team" in table_cols:
         st.subheader("Heatmap: Logs by Block v/s Team")
-        pivot = df.pivot_table(index='design_block', columns='team', aggfunc='size', fill_value=0)
+        heat = heatmap_counts(selected_table, version, filters_key)
+        pivot = heat.set_index(['design_block', 'team'])['count'].unstack(fill_value=0)
         fig = px.imshow(pivot, aspect='auto', color_continuous_scale='Reds',
                         title="Log Heatmap")
         st.plotly_chart(fig, use_container_width=True)
 
     # Error categorization trend
-    if 'failure_type' in df.columns and date_col:
+    if 'failure_type' in table_cols and date_col:
         st.subheader("Log Categorization Trend")
-        trend_cat = df.groupby([date_col, 'failure_type']).size().reset_index(name='count')
+        trend_cat = failure_trend(selected_table, version, filters_key, date_col)
         fig = px.area(trend_cat, x=date_col, y='count', color='failure_type',
                       title='Log Trend by Failure Type', groupnorm='fraction')
         st.plotly_chart(fig, use_container_width=True)
@@ -178,9 +273,9 @@ if not df.empty:
         st.plotly_chart(fig, use_container_width=True)
 
     # # Pareto Chart
-    if "design_block" in df.columns:
+    if block_counts is not None:
         st.subheader("Pareto Analysis of Log (80/20 Rule)")
-        pareto = df.groupby("design_block").size().reset_index(name='count').sort_values(by='count', ascending=False)
+        pareto = block_counts.copy()
         pareto['cum_pct'] = pareto['count'].cumsum() / pareto['count'].sum() * 100
 
         fig = go.Figure()
@@ -194,16 +289,26 @@ if not df.empty:
 
 # Show raw logs
 st.subheader("Raw Logs")
-st.dataframe(df.head(50))
+st.dataframe(load_filtered_data(selected_table, version, filters_key, limit=50))
 
 # Download option
 
-if not df.empty:
-    csv = df.to_csv(index=False).encode("utf-8")
-    st.download_button("Download filtered logs as CSV", csv, "logs_filtered.csv", "text/csv")
+if summary["total"]:
+    d1, d2 = st.columns(2)
+    with d1:
+        st.download_button("Download filtered logs as CSV",
+                           lambda: export_csv(selected_table, version, filters_key),
+                           "logs_filtered.csv", "text/csv")
+    with d2:
+        st.download_button("Download filtered logs as Parquet",
+                           lambda: export_parquet(selected_table, version, filters_key),
+                           "logs_filtered.parquet", "application/octet-stream")
+
+# Full filtered rows are only pulled into pandas on request
 
-if df.empty:
+if summary["total"] and st.checkbox("Load all filtered logs (up to 500,000 rows)"):
+    st.dataframe(load_filtered_data(selected_table, version, filters_key))
+
+if not summary["total"]:
     st.warning("No Logs found for selected Filters.")
     st.stop()
-
-conn.close()
@@ -1,8 +1,6 @@
 # New code
 
 import sqlite3
-import random
-from datetime import datetime
 
 DB = "C:/Users/sunbeam/OneDrive/Desktop/Projects/Dataware_house_project/logs.db"
 
@@ -23,58 +21,42 @@ def table_has_column(conn, table, column):
 # Assignment Functions
 # ----------------------------
 
-def assign_from_dim_rowwise(conn, table, dim_table, dim_col, target_col):
-    """Assign random values from a dimension table column into the target_col of the log table."""
+def random_pick_sql(table, dim_table, dim_col):
+    """SQL expression picking a random dim_col value from dim_table per row of table."""
+    # referencing the outer rowid keeps SQLite from caching one random value for all rows
+    return (f"(SELECT {dim_col} FROM {dim_table} WHERE {table}.rowid = {table}.rowid "
+            f"LIMIT 1 OFFSET abs(random()) % (SELECT COUNT(*) FROM {dim_table}))")
+
+# (dim_table, dim_col, target_col) assigned to every log row
+DIM_ASSIGNMENTS = [
+    ("dim_chip", "chip_id", "chip_id"),
+    ("dim_team", "team", "team"),
+    ("dim_design_block", "design_block", "design_block"),
+    ("dim_simulation", "simulation_id", "simulation_id"),
+    ("dim_business", "impact_score", "impact_score"),
+    ("dim_test_condition", "test_id", "test_condition"),
+]
+
+def enrich_table(conn, table):
+    """Assign every dimension column and the enrichment metadata in a single UPDATE."""
     cur = conn.cursor()
-    cur.execute(f"SELECT {dim_col} FROM {dim_table};")
-    values = [r[0] for r in cur.fetchall()]
-
-    if not values:
-        print(f"⚠️ No values in {dim_table}, skipping {target_col} for {table}")
-        return
-
-    cur.execute(f"SELECT rowid FROM {table};")
-    rowids = [r[0] for r in cur.fetchall()]
-
-    for rid in rowids:
-        val = random.choice(values)
-        cur.execute(f"UPDATE {table} SET {target_col}=? WHERE rowid=?", (val, rid))
-
-    conn.commit()
-    print(f"✔ {target_col} assigned for {table} ({len(rowids)} rows)")
-
-def assign_test_condition_random(conn, table):
-    """Assign random test conditions to each row from dim_test_condition."""
-    cur = conn.cursor()
-    cur.execute("SELECT test_id FROM dim_test_condition;")
-    test_conditions = [r[0] for r in cur.fetchall()]
-
-    if not test_conditions:
-        print("⚠️ No test conditions in dim_test_condition, skipping.")
-        return
-
-    cur.execute(f"SELECT rowid FROM {table};")
-    rowids = [r[0] for r in cur.fetchall()]
-
-    for rid in rowids:
-        tc = random.choice(test_conditions)
-        cur.execute(f"UPDATE {table} SET test_condition=? WHERE rowid=?", (tc, rid))
-
-    conn.commit()
-    print(f"✔ test_condition assigned for {table} ({len(rowids)} rows)")
-
-def assign_enrichment_metadata(conn, table):
-    """Mark enrichment metadata."""
-    cur = conn.cursor()
-    now = datetime.utcnow().isoformat()
-    cur.execute(f"""
-        UPDATE {table}
-        SET enrichment_status='complete',
-            metadata_assigned_at=?,
-            metadata_assigned_by='metadata_enrich.py',
-            metadata_version='v1.0'
-    """, (now,))
-    conn.commit()
+    sets = []
+    for dim_table, dim_col, target_col in DIM_ASSIGNMENTS:
+        cur.execute(f"SELECT COUNT(*) FROM {dim_table};")
+        if cur.fetchone()[0] == 0:
+            print(f"⚠️ No values in {dim_table}, skipping {target_col} for {table}")
+        else:
+            sets.append(f"{target_col} = {random_pick_sql(table, dim_table, dim_col)}")
+
+    n_dims = len(sets)
+    sets += [
+        "enrichment_status = 'complete'",
+        "metadata_assigned_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now')",
+        "metadata_assigned_by = 'metadata_enrich.py'",
+        "metadata_version = 'v1.0'",
+    ]
+    cur.execute(f"UPDATE {table} SET {', '.join(sets)};")
+    print(f"✔ {n_dims} dimensions + metadata assigned for {table} ({cur.rowcount} rows)")
 
 # ----------------------------
 # Validation
@@ -100,26 +82,27 @@ def validate_table(conn, table):
 def main():
     conn = sqlite3.connect(DB)
     conn.execute("PRAGMA journal_mode=WAL;")
+    # re-runnable bulk job: no fsync per commit, large in-memory cache
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA mmap_size=268435456;")
+    conn.execute("PRAGMA cache_size=-200000;")
 
     log_tables = get_log_tables(conn)
     print("Enriching metadata for:", log_tables)
 
     for table in log_tables:
-        # assign basic dimensions
-        assign_from_dim_rowwise(conn, table, "dim_chip", "chip_id", "chip_id")
-        assign_from_dim_rowwise(conn, table, "dim_team", "team", "team")
-        assign_from_dim_rowwise(conn, table, "dim_design_block", "design_block", "design_block")
-        assign_from_dim_rowwise(conn, table, "dim_simulation", "simulation_id", "simulation_id")
-        assign_from_dim_rowwise(conn, table, "dim_business", "impact_score", "impact_score")
-
-        # assign test_condition separately
-        assign_test_condition_random(conn, table)
+        # one write transaction per table
+        conn.execute("BEGIN IMMEDIATE;")
 
-        # mark enrichment done
-        assign_enrichment_metadata(conn, table)
+        enrich_table(conn, table)
+        conn.commit()
 
         print(f" - {table} enriched.")
 
+    # refresh planner stats now that the filter columns are populated
+    conn.execute("ANALYZE;")
+
     # validation summary
     print("Validation Summary")
     for table in log_tables:
@@ -114,11 +114,25 @@ def add_metadata_columns(conn, table):
             cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {typ};")
     conn.commit()
 
+# columns the dashboard filters on with LOWER(col) IN (...)
+FILTER_COLS = ["chip_id", "design_block", "team", "impact_score", "test_condition"]
+
+def create_filter_indexes(conn, table):
+    """Create LOWER(col) expression indexes so dashboard filters avoid full scans."""
+    cur = conn.cursor()
+    for col in FILTER_COLS:
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{col}_lower ON {table}(LOWER({col}));")
+    conn.commit()
+
 
 # main orchestration
 def main():
     conn = sqlite3.connect(db)
     conn.execute("PRAGMA journal_mode=WAL;") # better concurrency/performance
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA mmap_size=268435456;")
+    conn.execute("PRAGMA cache_size=-200000;")
     print("Discovering log tables...")
     logs = get_log_tables(conn)
     print("Found:", logs)
@@ -131,6 +145,11 @@ def main():
     for t in logs:
         add_metadata_columns(conn, t)
 
+    print("Creating filter indexes...")
+    for t in logs:
+        create_filter_indexes(conn, t)
+    conn.execute("ANALYZE;")
+
     conn.close()
     print("metadata_init completed. Database updated and ready for enrichment.")
 